@@ -0,0 +1,33 @@
+/*
+####################
+Add hydro_clamped_monthly_flows materialized view
+
+Date applied:
+Description: This script adds a materialized view holding the monthly hydro flows
+from hydro_historical_monthly_capacity_factors after the clamping that the input
+scripts used to apply in every hydro_timeseries query:
+- Some hydro plants have 100% capacity factors in a month, which exceeds their
+  standard maintenance derating of 5%. These conditions arise periodically with
+  individual hydro units, but rarely or never for virtual hydro units that aggregate
+  all hydro in a zone or zone + watershed. Flows are therefore capped at
+  capacity_limit_mw * (1 - forced_outage_rate). Eventually, we may rethink this
+  derating, but it is a reasonable approximation for a large hydro fleet where plant
+  outages are individual random events.
+- Negative or zero flows are replaced by 0.01.
+The view must be refreshed whenever hydro_historical_monthly_capacity_factors or the
+capacity or outage rate of a hydro plant in generation_plant changes:
+REFRESH MATERIALIZED VIEW switch.hydro_clamped_monthly_flows;
+#################
+*/
+
+CREATE MATERIALIZED VIEW switch.hydro_clamped_monthly_flows AS
+SELECT generation_plant_id, hydro_simple_scenario_id, year, month,
+    CASE WHEN hydro_min_flow_mw <= 0 THEN 0.01
+        WHEN hydro_min_flow_mw > capacity_limit_mw * (1 - forced_outage_rate) THEN capacity_limit_mw * (1 - forced_outage_rate)
+        ELSE hydro_min_flow_mw END AS hydro_min_flow_mw,
+    CASE WHEN hydro_avg_flow_mw <= 0 THEN 0.01
+        ELSE least(hydro_avg_flow_mw, capacity_limit_mw * (1 - forced_outage_rate)) END AS hydro_avg_flow_mw
+FROM switch.hydro_historical_monthly_capacity_factors
+    JOIN switch.generation_plant USING (generation_plant_id);
+
+CREATE INDEX ON switch.hydro_clamped_monthly_flows (hydro_simple_scenario_id, year, month);
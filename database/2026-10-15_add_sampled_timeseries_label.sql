@@ -0,0 +1,16 @@
+/*
+####################
+Add timeseries_label to sampled_timeseries
+
+Date applied:
+Description: This script adds a stored generated column timeseries_label to
+sampled_timeseries. It holds the timeseries name used in the input files,
+which the input scripts used to rebuild from first_timepoint_utc and name in
+every query that wrote a timeseries column. Postgres now computes it once,
+when a row is written. Requires PostgreSQL 12+.
+#################
+*/
+
+ALTER TABLE switch.sampled_timeseries
+    ADD COLUMN timeseries_label text
+        GENERATED ALWAYS AS (date_part('year', first_timepoint_utc)::int::text || '_' || replace(name, ' ', '_')) STORED;
@@ -10,11 +10,13 @@ from switch_model.tools.graph.main import Scenario
 from switch_model.tools.graph.cli import add_arguments, graph_scenarios_from_cli
 
 
+# Create the command line interface once so repeated calls to main() (e.g. from solve.py) reuse it
+_parser = argparse.ArgumentParser(description="Create graphs for a single set of SWITCH results.")
+add_arguments(_parser)
+
+
 def main(args=None):
-    # Create the command line interface
-    parser = argparse.ArgumentParser(description="Create graphs for a single set of SWITCH results.")
-    add_arguments(parser)
-    args = parser.parse_args(args)
+    args = _parser.parse_args(args)
 
     if args.graph_dir is None:
         args.graph_dir = "graphs"
@@ -32,14 +32,16 @@ def create_sampling_config():
     print("IMPORTANT: Edit sampling.yaml to specify your options.")
 
 
+_parser = argparse.ArgumentParser(description="Tool to setup either a new scenario folder or a new sampling config.")
+_parser.add_argument(
+    "type",
+    choices=["scenario", "sampling_config"],
+    help="Pick between setting up a new scenario folder or a sampling strategy."
+)
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Tool to setup either a new scenario folder or a new sampling config.")
-    parser.add_argument(
-        "type",
-        choices=["scenario", "sampling_config"],
-        help="Pick between setting up a new scenario folder or a sampling strategy."
-    )
-    args = parser.parse_args()
+    args = _parser.parse_args()
     if args.type == "scenario":
         create_run_config()
     elif args.type == "sampling_config":